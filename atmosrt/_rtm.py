@@ -24,6 +24,7 @@
 import os
 import re
 import shutil
+import stat
 import subprocess
 import tempfile
 import pickle
@@ -45,6 +46,31 @@ def get_data(path):
     return os.path.join(_ROOT, 'data', path)
 
 
+def _tmpfs_target():
+    """A per-user 0700 directory on tmpfs for throwaway runs, or None.
+
+    /dev/shm is world-writable and sticky, so never trust a path another
+    user could have planted there: refuse anything that is not a real
+    directory owned by us with mode 0700."""
+    if not os.path.isdir('/dev/shm'):
+        return None
+    path = '/dev/shm/atmosrt-%d' % os.getuid()
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    except OSError:
+        return None
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return None
+    if (not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid()
+            or stat.S_IMODE(st.st_mode) != 0o700):
+        return None
+    return path
+
+
 def _vars_to_file(vars):
     """Return a safe string to be used as a file or directory name"""
     clean_vars = [re.sub('[^a-zA-Z0-9_:-]', '.', str(v)) for v in vars]
@@ -67,6 +93,12 @@ class Model():
             self.config.update(userconfig)
         self.config.update(kwargs)
 
+        if target == '.' and cleanup:
+            # throwaway working directories: the input deck and model output
+            # are born and die inside one run, so keep them on tmpfs rather
+            # than paying disk traffic for them
+            target = _tmpfs_target() or target
+
         self.target = target
         self.cleanup = cleanup
 
@@ -137,12 +169,12 @@ class Working(object):
         """link some stuff in"""
         if type(resources) == str:
             resources = [resources]
-        try:
-            for resource in resources:
+        for resource in resources:
+            try:
                 os.symlink(os.path.join(path, resource), os.path.join(self.path, resource))
-        except OSError as err:
-            if err.errno != 17:
-                raise
+            except OSError as err:
+                if err.errno != 17:
+                    raise
 
     def write(self, file_name, content):
         if file_name in self.state.get('writes', []):
@@ -198,5 +230,8 @@ class Working(object):
 
     def get(self, file_name, mode='r'):
         """all these files should be closed before finishing with Working"""
-        return open(os.path.join(self.path, file_name), mode, encoding='latin_1')
+        file_path = os.path.join(self.path, file_name)
+        if 'b' in mode:
+            return open(file_path, mode)
+        return open(file_path, mode, encoding='latin_1')
 
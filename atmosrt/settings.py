@@ -23,6 +23,14 @@
 
 from dateutil.parser import parse as parsedt
 
+# run SMARTS through the libsmarts_295 extension when it is available,
+# instead of spawning the smarts.py wrapper in a subprocess
+use_inprocess = True
+
+# memoize SMARTS spectra (in memory and on disk) on a hash of the
+# translated card deck, so identical configs do not re-run the model
+use_cache = True
+
 defaults = {
     'description': 'Default Config',  # use internally; any string
 
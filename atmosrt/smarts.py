@@ -1,13 +1,25 @@
 
 
 import os
+import collections
+import concurrent.futures
+import functools
+import hashlib
+import tempfile
+import msgpack
 import numpy
 import pandas
 from contextlib import contextmanager
+from typing import NamedTuple
 
 from atmosrt import _rtm
 from atmosrt import settings
 
+try:
+    import libsmarts_295
+except ImportError:
+    libsmarts_295 = None
+
 resources = ['Albedo', 'CIE_data', 'Gases', 'Solar']
 resource_path = _rtm.get_data('smarts')
 input_file = 'smarts295.inp.txt'
@@ -16,6 +28,94 @@ output_file = 'smarts295.ext.txt'
 output_log = 'log.txt'
 output_headers = 1
 
+# output columns, in file order after the wavelength
+columns = ('direct_normal', 'diffuse', 'global', 'direct')
+
+# nm -> um for the wavelength, W/m2/nm -> W/m2/um for the irradiances
+_scale = numpy.array([1e-3, 1e3, 1e3, 1e3, 1e3], dtype=numpy.float32)
+
+
+class Spectrum(NamedTuple):
+    """spectrum as a structure of arrays; to_pandas() builds the
+    wavelength-indexed DataFrame view on demand"""
+
+    wavelength: numpy.ndarray
+    direct_normal: numpy.ndarray
+    diffuse: numpy.ndarray
+    global_: numpy.ndarray  # 'global' is a keyword
+    direct: numpy.ndarray
+
+    def to_pandas(self):
+        return pandas.DataFrame(
+            dict(zip(columns, self[1:])),
+            index=pandas.Index(self.wavelength, name='wavelength'))
+
+    def __getitem__(self, key):
+        # transition shim: keep column access working as on the former
+        # DataFrame return value
+        if isinstance(key, str):
+            return self.to_pandas()[key]
+        return tuple.__getitem__(self, key)
+
+
+# numpy.trapz was renamed trapezoid in numpy 2.0
+try:
+    _trapezoid = numpy.trapezoid
+except AttributeError:
+    _trapezoid = numpy.trapz
+
+# in-memory LRU of spectra, keyed by card-deck hash
+_spectrum_cache = collections.OrderedDict()
+_spectrum_cache_maxsize = 128
+
+
+def _spectrum_cache_insert(key, spectrum):
+    _spectrum_cache[key] = spectrum
+    _spectrum_cache.move_to_end(key)
+    while len(_spectrum_cache) > _spectrum_cache_maxsize:
+        _spectrum_cache.popitem(last=False)
+
+
+def _spectrum_cache_path(key):
+    cache_home = os.environ.get('XDG_CACHE_HOME',
+                                os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(cache_home, 'atmosrt', 'spectra', key + '.msgpack')
+
+
+def _spectrum_cache_lookup(key):
+    try:
+        spectrum = _spectrum_cache[key]
+        _spectrum_cache.move_to_end(key)
+        return spectrum
+    except KeyError:
+        pass
+    try:
+        with open(_spectrum_cache_path(key), 'rb') as stored:
+            payload = msgpack.unpackb(stored.read(), raw=False)
+        # frombuffer views are read-only, like the fields frozen in
+        # _spectrum_cache_store, so both cache tiers behave the same
+        spectrum = Spectrum(*(numpy.frombuffer(payload[name], dtype='float32')
+                              for name in ('wavelength',) + columns))
+    except (IOError, ValueError, KeyError):
+        return None
+    _spectrum_cache_insert(key, spectrum)
+    return spectrum
+
+
+def _spectrum_cache_store(key, spectrum):
+    # freeze the fields before sharing them: the same Spectrum is handed
+    # to every caller with this config, so a writable view would let one
+    # caller corrupt the cache for everyone
+    for field in spectrum:
+        field.flags.writeable = False
+    _spectrum_cache_insert(key, spectrum)
+    payload = {name: field.astype('float32', copy=False).tobytes()
+               for name, field in zip(('wavelength',) + columns, tuple(spectrum))}
+    path = _spectrum_cache_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as stored:
+        stored.write(msgpack.packb(payload, use_bin_type=True))
+
 
 class SMARTSError(_rtm.RTMError):
     pass
@@ -36,275 +136,315 @@ class SMARTS(_rtm.Model):
             return working.get(rawfile)
 
     @contextmanager
-    def run(self):
+    def run(self, cards=None):
         """run smarts"""
 
+        if cards is None:
+            cards = cardify(translate(self.config))
+
         with _rtm.Working(self) as working:
             working.link(resources, path=resource_path)
-            full_cmd = '%s > %s' % (command, output_log)
-            cards = cardify(translate(self.config))
             working.write(input_file, cards)
-            code, err, rcfg = working.run(full_cmd, output_log)
-
-            if code == 127:
-                raise SMARTSError("%d: SMARTS Executable not found. Did you install it correctly? stderr:\n%s" % (code, err))
-            elif code != 0:
-                raise SMARTSError("%s: Execution failed with code %d. stderr:\n%s" % (working.path, code, err))
-
-            # check for errors
-            smlog = working.get('smarts295.out.txt')
-            for line in smlog:
-                if 'ERROR' in line:
-                    if '** ERROR #7 ***' in line:
-                        raise SunDownError('%s: smarts refuses to work when the sun is down.\n%s' % (working.path, line))
-                    else:
-                        raise SMARTSError("%s: smarts no like\n%s" % (working.path, line))
+
+            if settings.use_inprocess and libsmarts_295 is not None:
+                # call the Fortran extension directly: same file-based I/O in
+                # the working directory, but no fork/exec or wrapper startup
+                cwd = os.getcwd()
+                os.chdir(working.path)
+                try:
+                    libsmarts_295.smarts_295()
+                finally:
+                    os.chdir(cwd)
+            else:
+                full_cmd = '%s > %s' % (command, output_log)
+                code, err, rcfg = working.run(full_cmd, output_log)
+
+                if code == 127:
+                    raise SMARTSError("%d: SMARTS Executable not found. Did you install it correctly? stderr:\n%s" % (code, err))
+                elif code != 0:
+                    raise SMARTSError("%s: Execution failed with code %d. stderr:\n%s" % (working.path, code, err))
+
+            # check for errors: one C-level scan of the log instead of a
+            # Python loop over its lines; line granularity is only needed
+            # on a hit, to tell error #7 apart
+            with working.get('smarts295.out.txt', 'rb') as smlog:
+                blob = smlog.read()
+            idx = blob.find(b'ERROR')
+            if idx >= 0:
+                start = blob.rfind(b'\n', 0, idx) + 1
+                end = blob.find(b'\n', idx)
+                line = blob[start:end if end >= 0 else len(blob)].decode('latin_1')
+                if '** ERROR #7 ***' in line:
+                    raise SunDownError('%s: smarts refuses to work when the sun is down.\n%s' % (working.path, line))
+                else:
+                    raise SMARTSError("%s: smarts no like\n%s" % (working.path, line))
             yield working
 
     def spectrum(self):
-        """get the global spectrum for the atmosphere"""
+        """get the global spectrum for the atmosphere, as a Spectrum
+        (use .to_pandas() for the DataFrame view)"""
+
+        cards = cardify(translate(self.config))
+        if settings.use_cache:
+            key = hashlib.blake2b(cards.encode(), digest_size=16).hexdigest()
+            cached = _spectrum_cache_lookup(key)
+            if cached is not None:
+                return cached
 
-        with self.run() as working:
+        with self.run(cards) as working:
             try:
                 smout = working.get(output_file)
             except IOError:
                 raise SMARTSError("%s: didn't get output %s" %
                                   (working.path, output_file))
 
-            model_spectrum = pandas.read_csv(smout, skiprows=1, delimiter=' ',
-                                             names=['wavelength', 'direct_normal', 'diffuse', 'global', 'direct'])
+            raw = smout.read()
 
-            model_spectrum['wavelength'] /= 1000
-            model_spectrum['direct_normal'] *= 1000
-            model_spectrum['diffuse'] *= 1000
-            model_spectrum['direct'] *= 1000
-            model_spectrum['global'] *= 1000
+        # one numpy pass over the (small, all-float) output instead of the
+        # pandas CSV engine, then the unit conversions in place; the column
+        # count and dtype are known a priori, so parse straight to float32,
+        # the dtype the cache stores and the model precision warrants
+        body = raw.split('\n', output_headers)[output_headers]
+        arr = numpy.fromstring(body, dtype=numpy.float32, sep=' ').reshape(-1, 5)
+        numpy.multiply(arr, _scale, out=arr)  # all unit conversions, one pass
 
-        return model_spectrum.set_index('wavelength')
+        model_spectrum = Spectrum(*arr.T)
+        if settings.use_cache:
+            _spectrum_cache_store(key, model_spectrum)
+        return model_spectrum
 
     def irradiance(self):
         """Get the integrated irradiance across the spectrum"""
 
+        return pandas.DataFrame(self.irradiance_array()[None, :], columns=list(columns))
+
+    def irradiance_array(self):
+        """Integrated irradiance as a plain ndarray, for hot loops that
+        do not need the DataFrame wrapping"""
+
         data = self.spectrum()
-        wrk = numpy.trapz(data, x=data.index, axis=0)
-        return pandas.DataFrame(wrk[None, :], columns=data.columns)
+        return _trapezoid(numpy.stack(tuple(data)[1:], axis=-1), x=data.wavelength, axis=0)
 
 
-def cardify(params):
-    mutable = {'content': ''}  # MUTABLE! Can't just use string. grr.
+def _run_batch_worker(config, method):
+    # each worker stages its model under the system temp directory, so
+    # parallel runs do not collide on working-directory names in cwd
+    model = SMARTS(config, target=tempfile.gettempdir())
+    return getattr(model, method)()
+
 
-    def card_print(something, comment=None, no_break=False):
-        mutable['content'] += str(something)
-        if comment:
-            mutable['content'] += ' \t\t\t! %s' % comment
-        if not no_break:
-            mutable['content'] += '\n'
+def run_batch(config_list, n_jobs=None, method='spectrum'):
+    """Run SMARTS for many configurations in parallel.
 
-    # CARD 1
-    card_print('\'%s\'' % params['COMNT'], '1 COMNT')
+    The runs are independent processes sharing only read-only resources,
+    so they scale across cores. Spectra already memoized are answered
+    from the cache without hitting the pool. Results come back in the
+    order of config_list; method can be 'spectrum', 'irradiance' or
+    'irradiance_array'.
+    """
+    results = [None] * len(config_list)
+    pending = {}  # card-deck key -> indices waiting for that deck's result
+    submitted = {}
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=n_jobs or os.cpu_count()) as pool:
+        for i, config in enumerate(config_list):
+            # identical card decks share one submission: they would also
+            # share a working directory, and running them concurrently
+            # there corrupts each other's output files
+            cards = cardify(translate(config))
+            key = hashlib.blake2b(cards.encode(), digest_size=16).hexdigest()
+
+            if method == 'spectrum' and settings.use_cache:
+                cached = _spectrum_cache_lookup(key)
+                if cached is not None:
+                    results[i] = cached
+                    continue
+
+            if key in pending:
+                pending[key].append(i)
+                continue
+            pending[key] = [i]
+            submitted[pool.submit(_run_batch_worker, config, method)] = key
+
+        for future in concurrent.futures.as_completed(submitted):
+            result = future.result()
+            for i in pending[submitted[future]]:
+                results[i] = result
+
+    return results
+
+
+# the card deck is fully determined by the translated parameters, so it is
+# one str.format_map call on this template (cards 1-17, one line comments
+# as before); only card 3a depends on the IATMOS mode and is built apart
+_DECK_TEMPLATE = """\
+'{COMNT}' \t\t\t! 1 COMNT
+1 \t\t\t! 2 ISPR mode select
+{SPR} {ALTIT} {HEIGHT}
+{IATMOS} \t\t\t! 3 IATMOS mode select
+{ATMOS_CARD}
+2 \t\t\t! 4 IH2O mode select
+0 \t\t\t! 5 IO3 mode select
+0 {AbO3:f} \t\t\t! ozone column
+0 \t\t\t! 6 IGAS
+0 \t\t\t! ILOAD
+{ApCH2O:f} {ApCh4:f} {ApCO:f} {ApHNO2:f} {ApHNO3:f} {ApNO:f} {ApNO2:f} {ApNO3:f} {ApO3:f} {ApSO2:f} \t\t\t! gasses
+{qCO2} \t\t\t! 7 qCO2 ppm
+0
+'USER' \t\t\t! 8 AEROS
+{ALPHA1} {ALPHA2} {OMEGL} {GG}
+5 \t\t\t! 9 ITURB
+{TAU550}
+{IALBDX} \t\t\t! 10 IALBDX
+0
+{WLMN} {WLMX} {SUNCOR} {SOLARC} \t\t\t! 11 blergh
+2 \t\t\t! 12 IPRT
+{WPMN} {WPMX} {INTVL}
+4
+2 3 4 5
+0 \t\t\t! 13 ICIRC
+0 \t\t\t! 14 ISCAN
+0 \t\t\t! 15 ILLUM
+0 \t\t\t! 16 IUV
+3 \t\t\t! 17 IMASS
+{YEAR} {MONTH} {DAY} {HOUR} {LATIT} {LONGIT} {ZONE}
+
+"""
 
-    # CARD 2
-    card_print(1, '2 ISPR mode select')
-    card_print('%s %s %s' % (params['SPR'], params['ALTIT'], params['HEIGHT']))
 
-    # CARD 3
-    card_print(params['IATMOS'], '3 IATMOS mode select')
+def cardify(params):
+    # Card 3a: surface conditions or reference atmosphere
     if params['IATMOS'] == 0:
-        card_print('%s %s \'%s\' %s' % (params['TAIR'], params['RH'],
-                                        params['SEASON'], params['TDAY']))
+        atmos_card = '%s %s \'%s\' %s' % (params['TAIR'], params['RH'],
+                                          params['SEASON'], params['TDAY'])
     else:
         assert params['IATMOS'] == 1, 'bad smarts IATMOS (not 0 or 1)'
-        card_print('\'%s\'' % params['ATMOS'])
-
-    # Card 4
-    card_print(2, '4 IH2O mode select')
-
-    # Card 5
-    card_print(0, '5 IO3 mode select')  # use default ozone
-
-    # add 5a and put a default in settings for it
-    card_print('%d %f' % (0, params['AbO3']), 'ozone column')
-
-    # Card 6
-    card_print(0, '6 IGAS')  # specify gasses
-    card_print(0, 'ILOAD')
-    card_print('%f %f %f %f %f %f %f %f %f %f' %
-               tuple(params[gas] for gas in
-                     ['ApCH2O', 'ApCh4', 'ApCO', 'ApHNO2', 'ApHNO3', 'ApNO', 'ApNO2',
-                      'ApNO3', 'ApO3', 'ApSO2']), 'gasses')
-
-    # Card 7
-    card_print(str(params['qCO2']), '7 qCO2 ppm')
-    card_print(0)  # SPECTRUM -- Gueymard 2004
-
-    # Card 8
-    card_print('\'USER\'', '8 AEROS')
-    card_print('%s %s %s %s' % (params['ALPHA1'], params['ALPHA2'],
-                                params['OMEGL'], params['GG']))
-
-    # Card 9
-    card_print(5, '9 ITURB')  # read TAU550
-    card_print(str(params['TAU550']))
-
-    # Card 10
-    card_print(str(params['IALBDX']), '10 IALBDX')
-    card_print(0)  # 10b: no tilted surface
-
-    # Card 11
-    card_print('%s %s %s %s' % (params['WLMN'], params['WLMX'],
-                                params['SUNCOR'], params['SOLARC']), '11 blergh')
-
-    # Card 12
-    card_print(2, '12 IPRT')
-    card_print('%s %s %s' % (params['WPMN'], params['WPMX'], params['INTVL']))
-    card_print('4')  # NUMBER OF OUTPUT COLUMNS
-    card_print('2 3 4 5')  # direct normal, diffuse, global, direct (horizontal)
-
-    # Card 13
-    card_print(0, '13 ICIRC')
-
-    # Card 14
-    card_print(0, '14 ISCAN')
-
-    # Card 15
-    card_print(0, '15 ILLUM')
-
-    # Card 16
-    card_print(0, '16 IUV')
-
-    # Card 17
-    card_print(3, '17 IMASS')
-    card_print('%s %s %s %s %s %s %s' % (params['YEAR'], params['MONTH'],
-                                         params['DAY'], params['HOUR'], params['LATIT'],
-                                         params['LONGIT'], params['ZONE']))
-
-    # Spit out our formatted string.
-    card_print('')
-    return mutable['content']
+        atmos_card = '\'%s\'' % params['ATMOS']
+
+    return _DECK_TEMPLATE.format_map({**params, 'ATMOS_CARD': atmos_card})
+
+
+_UNSUPPORTED = frozenset({'cloud_altitude', 'cloud_thickness', 'cloud_optical_depth',
+                          'nitrogen', 'oxygen', 'ammonia', 'nitrous_oxide'})
+
+_HARD_CODE = {
+    'HEIGHT': 0,  # Card 2 Mode 1 -- height above elevation
+    'ZONE': 0,  # Card 17 Mode 3 (datetime is converted to UTC)
+    'SUNCOR': 1,  # overwritten anyway (calculated from card 17)
+}
+
+_DIRECT = {
+    'solar_constant': 'SOLARC',
+    'longitude': 'LONGIT',
+    'latitude': 'LATIT',
+    'elevation': 'ALTIT',
+    'average_daily_temperature': 'TAIR',
+    'temperature': 'TDAY',
+    'pressure': 'SPR',
+    'relative_humidity': 'RH',
+    'carbon_dioxide': 'qCO2',
+    'single_scattering_albedo': 'OMEGL',
+    'angstroms_coefficient': 'TAU550',
+    'aerosol_asymmetry': 'GG',
+    'boundary_layer_ozone': 'AbO3',
+
+    'formaldehyde': 'ApCH2O',
+    'methane': 'ApCh4',
+    'carbon_monoxide': 'ApCO',
+    'nitrous_acid': 'ApHNO2',
+    'nitric_acid': 'ApHNO3',
+    'nitric_oxide': 'ApNO',
+    'nitrogen_dioxide': 'ApNO2',
+    'nitrogen_trioxide': 'ApNO3',
+    'sulphur_dioxide': 'ApSO2',
+}
+
+_CONVERT = {
+    'description': lambda v: {
+        'COMNT': "_".join(v[:64].split())
+    },
+    'time': lambda v:
+        (lambda tt: {
+            'YEAR': tt.tm_year,
+            'MONTH': tt.tm_mon,
+            'DAY': tt.tm_mday,
+            'HOUR': tt.tm_hour + tt.tm_min / 60.0 + tt.tm_sec / 3600.0,
+        })(v.utctimetuple()),
+    'season': lambda v: {
+        'SEASON': {
+            'winter': 'WINTER',
+            'summer': 'SUMMER',
+        }[v]
+    },
+    'surface_type': lambda v: {
+        'IALBDX': {
+            'snow': 3,
+            'clear water': 2,
+            'lake water': 35,
+            'sea water': 35,
+            'sand': 6,
+            'vegetation': 17,
+            'ocean water': 35,
+        }[v]
+    },
+    'atmosphere': lambda v: {
+        'ATMOS': {
+            'tropical': 'TRL',
+            'mid-latitude summer': 'MLS',
+            'mid-latitude winter': 'MLW',
+            'sub-arctic summer': 'SAS',
+            'sub-arctic winter': 'SAW',
+            'us62': 'USSA',
+        }[v]
+    },
+    'angstroms_exponent': lambda v: {
+        'ALPHA1': v,
+        'ALPHA2': v,
+    },
+    'tropospheric_ozone': lambda v: {
+        'ApO3': v * 10,  # atm-cm -> ppmv
+    },
+    'lower_limit': lambda v: {
+        'WLMN': v * 1000,  # um -> nm
+        'WPMN': v * 1000,  # um -> nm
+    },
+    'upper_limit': lambda v: {
+        'WLMX': v * 1000,  # um -> nm
+        'WPMX': v * 1000,  # um -> nm
+    },
+    'resolution': lambda v: {
+        'INTVL': v * 1000,  # um -> nm
+    },
+    'smarts_use_standard_atmos': lambda v: {
+        'IATMOS': 1 if v else 0,
+    },
+}
 
 
 def translate(params):
     "Translates both keys and values where appropriate for use with SMARTS"
-    p = dict(settings.defaults)
-    p.update(params)
-
-    unsupported = ['cloud_altitude', 'cloud_thickness', 'cloud_optical_depth',
-                   'nitrogen', 'oxygen', 'ammonia', 'nitrous_oxide']
-
-    hard_code = {
-        'HEIGHT': 0,  # Card 2 Mode 1 -- height above elevation
-        'ZONE': 0,  # Card 17 Mode 3 (datetime is converted to UTC)
-        'SUNCOR': 1,  # overwritten anyway (calculated from card 17)
-    }
-
-    direct = {
-        'solar_constant': 'SOLARC',
-        'longitude': 'LONGIT',
-        'latitude': 'LATIT',
-        'elevation': 'ALTIT',
-        'average_daily_temperature': 'TAIR',
-        'temperature': 'TDAY',
-        'pressure': 'SPR',
-        'relative_humidity': 'RH',
-        'carbon_dioxide': 'qCO2',
-        'single_scattering_albedo': 'OMEGL',
-        'angstroms_coefficient': 'TAU550',
-        'aerosol_asymmetry': 'GG',
-        'boundary_layer_ozone': 'AbO3',
-
-        'formaldehyde': 'ApCH2O',
-        'methane': 'ApCh4',
-        'carbon_monoxide': 'ApCO',
-        'nitrous_acid': 'ApHNO2',
-        'nitric_acid': 'ApHNO3',
-        'nitric_oxide': 'ApNO',
-        'nitrogen_dioxide': 'ApNO2',
-        'nitrogen_trioxide': 'ApNO3',
-        'sulphur_dioxide': 'ApSO2',
-    }
-
-    convert = {
-        'description': ((), lambda v: {
-            'COMNT': "_".join(v[:64].split())
-        }),
-        'time': ((), lambda v:
-                 (lambda tt: {
-                     'YEAR': tt.tm_year,
-                     'MONTH': tt.tm_mon,
-                     'DAY': tt.tm_mday,
-                     'HOUR': tt.tm_hour + tt.tm_min / 60.0 + tt.tm_sec / 3600.0,
-                 })(v.utctimetuple())
-                 ),
-        'season': ((), lambda v: {
-            'SEASON': {
-                'winter': 'WINTER',
-                'summer': 'SUMMER',
-            }[v]
-        }),
-        'surface_type': ((), lambda v: {
-            'IALBDX': {
-                'snow': 3,
-                'clear water': 2,
-                'lake water': 35,
-                'sea water': 35,
-                'sand': 6,
-                'vegetation': 17,
-                'ocean water': 35,
-            }[v]
-        }),
-        'atmosphere': ((), lambda v: {
-            'ATMOS': {
-                'tropical': 'TRL',
-                'mid-latitude summer': 'MLS',
-                'mid-latitude winter': 'MLW',
-                'sub-arctic summer': 'SAS',
-                'sub-arctic winter': 'SAW',
-                'us62': 'USSA',
-            }[v]
-        }),
-        'angstroms_exponent': ((), lambda v: {
-            'ALPHA1': v,
-            'ALPHA2': v,
-        }),
-        'tropospheric_ozone': ((), lambda v: {
-            'ApO3': v * 10,  # atm-cm -> ppmv
-        }),
-        'lower_limit': ((), lambda v: {
-            'WLMN': v * 1000,  # um -> nm
-            'WPMN': v * 1000,  # um -> nm
-        }),
-        'upper_limit': ((), lambda v: {
-            'WLMX': v * 1000,  # um -> nm
-            'WPMX': v * 1000,  # um -> nm
-        }),
-        'resolution': ((), lambda v: {
-            'INTVL': v * 1000,  # um -> nm
-        }),
-        'smarts_use_standard_atmos': ((), lambda v: {
-            'IATMOS': 1 if v else 0,
-        }),
-    }
-
-    processed = []
-    translated = {}
-    translated.update(hard_code)
-
-    def addItem(param, val):
-        if param not in unsupported:
-            if param in direct:
-                translated.update({direct[param]: val})
-            elif param in convert:
-                for d in convert[param][0]:
-                    if d not in processed:
-                        addItem(d)
-                translated.update(convert[param][1](val))
-            else:
-                print("x %s" % param)  # ERROR!
+    # the translation is pure, so memoize it on the frozen parameter items
+    # (lists coerced to tuples so the key is hashable)
+    return dict(_translate_frozen(frozenset(
+        (param, tuple(val) if isinstance(val, list) else val)
+        for param, val in params.items())))
+
 
-        processed.append(param)
+@functools.lru_cache(maxsize=1024)
+def _translate_frozen(params_items):
+    # overlay the parameters on the defaults without copying the full
+    # defaults dict
+    p = collections.ChainMap(dict(params_items), settings.defaults)
 
+    translated = dict(_HARD_CODE)
     for param, val in p.items():
-        if param not in processed:
-            addItem(param, val)
+        if param in _UNSUPPORTED:
+            continue
+        if param in _DIRECT:
+            translated[_DIRECT[param]] = val
+        elif param in _CONVERT:
+            translated.update(_CONVERT[param](val))
+        else:
+            print("x %s" % param)  # ERROR!
 
     return translated
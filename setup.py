@@ -25,8 +25,57 @@
 """
 
 
-import setuptools
-from numpy.distutils.core import setup, Extension
+import os
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from glob import glob
+
+from setuptools import Extension, setup
+from setuptools.command.build_ext import build_ext
+
+
+class F2pyBuildExt(build_ext):
+    """build the Fortran extensions by shelling out to numpy.f2py"""
+
+    def run(self):
+        # the extensions are independent and gfortran dominates the build
+        # time, so compile them concurrently; check_call releases the GIL
+        # while the compiler runs, so threads are enough
+        with ThreadPoolExecutor(max_workers=len(self.extensions)) as pool:
+            list(pool.map(self._build_with_f2py, self.extensions))
+
+    def _build_with_f2py(self, ext):
+        build_temp = os.path.join(self.build_temp, ext.name)
+        os.makedirs(build_temp, exist_ok=True)
+
+        # the models are numeric loop code, worth compiling aggressively;
+        # -march=native and -ffast-math are opt-in to keep wheels portable
+        # and results bit-reproducible by default. -std=legacy keeps
+        # gfortran >= 10 from rejecting the argument mismatches in the
+        # old Fortran (sbdart's all.f does not build without it)
+        fortran_flags = '-O3 -funroll-loops -std=legacy'
+        if os.environ.get('ATMOSRT_NATIVE') == '1':
+            fortran_flags += ' -march=native -ffast-math'
+
+        sources = [os.path.abspath(source) for source in ext.sources]
+        cmd = [sys.executable, '-m', 'numpy.f2py', '-c'] + sources + [
+            '-m', ext.name,
+            '--f77flags=' + fortran_flags,
+            '--f90flags=' + fortran_flags,
+        ]
+
+        env = dict(os.environ)
+        # the meson backend of f2py takes its flags from FFLAGS
+        env['FFLAGS'] = ' '.join(filter(None, [env.get('FFLAGS'), fortran_flags]))
+        env.setdefault('NPY_NUM_BUILD_JOBS', str(os.cpu_count()))
+        subprocess.check_call(cmd, cwd=build_temp, env=env)
+
+        built = glob(os.path.join(build_temp, ext.name + '*.so'))[0]
+        target = self.get_ext_fullpath(ext.name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copy(built, target)
 
 
 libsbdart = Extension(name='libsbdart',
@@ -59,6 +108,7 @@ setup(
     long_description_content_type='text/markdown',
     url="https://github.com/ghislainp/atmosrt",
     ext_modules=[libsbdart, libsmarts],
+    cmdclass={'build_ext': F2pyBuildExt},
     scripts=['src/sbdart/sbdart.py', 'src/smarts/smarts.py'],
     packages=['atmosrt'],
     include_package_data=True,
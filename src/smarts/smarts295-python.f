@@ -217,8 +217,8 @@ c
 c**********************************************************************
 c
       smart=' Welcome to SMARTS, version 2.9.5!'
-      write(6,314,iostat=Ierr1) smart
- 314  format(/,35('*'),/,a48,/,35('*'))
+ !      write(6,314,iostat=Ierr1) smart
+ ! 314  format(/,35('*'),/,a48,/,35('*'))
 c
       if(batch)goto 313
 c
@@ -3589,10 +3589,10 @@ c
       CLOSE (UNIT=41,STATUS='KEEP')
 c
 		TotTime    = etime(time) - TotTime
-		write(6, 9910) TotTime
- 9910	format ("Total CPU time: ",f7.3," sec")
+ !		write(6, 9910) TotTime
+ ! 9910	format ("Total CPU time: ",f7.3," sec")
 c
-      STOP
+      RETURN
       END SUBROUTINE SMARTS_295
 c
 c
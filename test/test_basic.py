@@ -1,4 +1,6 @@
 
+import numpy
+
 import atmosrt
 
 
@@ -9,6 +11,57 @@ def test_smarts():
     print(moderate_model.spectrum())
 
 
+def test_smarts_spectrum_fields():
+    spectrum = atmosrt.SMARTS(atmosrt.settings.pollution['moderate']).spectrum()
+
+    assert isinstance(spectrum, atmosrt.smarts.Spectrum)
+    n, = spectrum.wavelength.shape
+    assert n > 0
+    for field in spectrum:
+        assert field.shape == (n,)
+        assert field.dtype == numpy.float32
+
+    frame = spectrum.to_pandas()
+    assert list(frame.columns) == list(atmosrt.smarts.columns)
+    assert frame.index.name == 'wavelength'
+    # the transition shim keeps string column access working
+    assert numpy.array_equal(spectrum['global'].values, spectrum.global_)
+
+
+def test_smarts_cache_hit():
+    config = atmosrt.settings.pollution['moderate']
+    first = atmosrt.SMARTS(config).spectrum()
+    again = atmosrt.SMARTS(config).spectrum()
+    for a, b in zip(first, again):
+        assert numpy.array_equal(a, b)
+        assert not b.flags.writeable  # cached arrays are frozen
+
+
+def test_smarts_run_batch():
+    configs = [atmosrt.settings.pollution['moderate'],
+               atmosrt.settings.pollution['severe']]
+    results = atmosrt.smarts.run_batch(configs, n_jobs=2)
+    assert len(results) == len(configs)
+    for result, config in zip(results, configs):
+        expected = atmosrt.SMARTS(config).spectrum()
+        assert numpy.array_equal(result.wavelength, expected.wavelength)
+        assert numpy.array_equal(result.global_, expected.global_)
+
+
+def test_smarts_spectrum_twice():
+    # the in-process Fortran path must be callable repeatedly without
+    # terminating the interpreter (smarts295-python.f used to STOP)
+    atmosrt.settings.use_cache = False
+    try:
+        model = atmosrt.SMARTS(atmosrt.settings.pollution['moderate'])
+        first = model.spectrum()
+        second = model.spectrum()
+    finally:
+        atmosrt.settings.use_cache = True
+    assert numpy.array_equal(first.wavelength, second.wavelength)
+    assert numpy.array_equal(first.global_, second.global_)
+
+
 def test_sbdart():
     # very basic test
     moderate_model = atmosrt.SBdart(atmosrt.settings.pollution['moderate'])